@@ -2,34 +2,102 @@
 Flask API: GET /api/detections, GET /api/stats, GET /api/system.
 Same JSON contract as BirdNET-Go Home Assistant API.
 """
+import hashlib
 import os
 import socket
 import sqlite3
 import time
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import date, datetime, timedelta
+from types import MappingProxyType
+from typing import Any, Iterator, Mapping, Optional
 
+import orjson
 import psutil
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from flask import Flask, jsonify, request
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 
 from config import load_config
-from db import get_connection, get_detections_v2, get_stats_v2, get_hourly_detections, get_aggregate_detections, SchemaError
+from db import shared_connection, get_detections_v2, get_stats_v2, get_hourly_detections, get_aggregate_detections, SchemaError
 from birdnet_config import get_birdnet_config_info
 
-app = Flask(__name__)
-_config: Optional[dict] = None
 
+class OrjsonProvider(JSONProvider):
+    """
+    Sérialisation JSON via orjson pour jsonify (listes de détections jusqu'à 500 lignes,
+    interrogées en boucle par Home Assistant) : nettement plus rapide que json.dumps.
+    """
+
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC
 
-def get_config():
-    global _config
-    if _config is None:
-        _config = load_config()
-    return _config
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, option=self.option).decode()
 
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
 
-def _effective_timezone_for_hourly(cfg: dict) -> Optional[str]:
+
+app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+# Config figée au premier get_config() (main / run_app) et valeurs dérivées lues par les routes
+CONFIG: Mapping[str, Any] = MappingProxyType({})
+DB_PATH = ""
+CLIPS_BASE = ""
+BIRDNET_DB_PATH: Optional[str] = None
+BIRDNET_CONFIG_PATH: Optional[str] = None
+HOURLY_TZ: Optional[str] = None
+_config_loaded = False
+
+# Corps constant de /health (sondé en boucle par Docker / les moniteurs)
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "birdnet-api2ha"})
+
+# Corps JSON déjà encodés de / et /api/birdnet-config, réutilisés tant que
+# get_birdnet_config_info renvoie le même objet (il est lui-même mis en cache).
+# Chaque entrée est un tuple (clé, corps, etag) remplacé d'un bloc : le serveur
+# est multi-thread, une requête concurrente ne voit jamais une entrée à moitié écrite.
+_index_cache: tuple[Any, bytes, str] = (None, b"", "")
+_birdnet_config_cache: tuple[Any, bytes, str] = (None, b"", "")
+
+# Durées Cache-Control (secondes) des réponses GET ; /health et /api/system ne sont pas mis en cache.
+CONFIG_MAX_AGE = 60
+DETECTIONS_MAX_AGE = 10
+
+# Résultats encodés de /api/stats par (date_start, date_end, état de la base) : Home Assistant
+# interroge la même plage en boucle, la base n'est pas écrite par ce processus. L'état
+# (mtime de la base et du -wal, voir _db_stamps) est celui qui sert à l'ETag : un corps
+# n'est jamais renvoyé avec l'ETag d'une autre version de la base.
+STATS_CACHE_TTL = 30
+STATS_CACHE_MAX = 64
+_stats_cache: dict[tuple[Optional[str], Optional[str], tuple[int, int]], tuple[float, bytes]] = {}
+
+# Nombre de détections encodées par morceau dans la réponse en flux de /api/detections
+DETECTIONS_STREAM_BATCH = 100
+
+# Résultat de os.path.isfile(database_path), revalidé au plus toutes les DB_CHECK_TTL secondes
+DB_CHECK_TTL = 5.0
+_db_check: dict[str, Any] = {"path": None, "exists": False, "t": 0.0}
+
+# Bornes de period=week : (aujourd'hui, (lundi, aujourd'hui)), recalculées une fois par jour.
+_week_cache: tuple[Optional[date], tuple[Optional[str], Optional[str]]] = (None, (None, None))
+
+
+def get_config() -> Mapping[str, Any]:
+    """Charge config.yaml une seule fois (mapping en lecture seule) et fige les valeurs dérivées."""
+    global CONFIG, DB_PATH, CLIPS_BASE, BIRDNET_DB_PATH, BIRDNET_CONFIG_PATH, HOURLY_TZ, _config_loaded
+    if not _config_loaded:
+        CONFIG = MappingProxyType(load_config())
+        DB_PATH = (CONFIG.get("database_path") or "").strip()
+        CLIPS_BASE = CONFIG.get("clips_base_path") or ""
+        BIRDNET_DB_PATH = CONFIG.get("database_path") or None
+        BIRDNET_CONFIG_PATH = (CONFIG.get("birdnet_config_path") or "").strip() or None
+        HOURLY_TZ = _effective_timezone_for_hourly(CONFIG)
+        _config_loaded = True
+    return CONFIG
+
+
+def _effective_timezone_for_hourly(cfg: Mapping[str, Any]) -> Optional[str]:
     """
     Fuseau IANA pour /api/hourly (schéma v2) : d'abord config.yaml `timezone`,
     sinon la variable d'environnement TZ (souvent déjà définie dans Docker Compose).
@@ -70,23 +138,110 @@ def _setup_cors():
     CORS(app, resources={r"/api/*": {"origins": allowed_origins}})
 
 
+def _json_bytes(body: bytes):
+    """Réponse JSON à partir d'un corps déjà encodé (pas de jsonify)."""
+    return app.response_class(body, mimetype="application/json")
+
+
+def _db_exists(db_path: str) -> bool:
+    """os.path.isfile(db_path) mis en cache quelques secondes (appelé à chaque requête)."""
+    now = time.monotonic()
+    if _db_check["path"] != db_path or now - _db_check["t"] > DB_CHECK_TTL:
+        _db_check["path"] = db_path
+        _db_check["exists"] = os.path.isfile(db_path)
+        _db_check["t"] = now
+    return _db_check["exists"]
+
+
+def _body_etag(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+def _db_stamps(db_path: str) -> tuple[int, int]:
+    """mtime (ns) de la base et de son journal -wal : changent dès que BirdNET-Go écrit."""
+    stamps = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            stamps.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamps.append(0)
+    return stamps[0], stamps[1]
+
+
+def _db_etag(stamps: tuple[int, int], *parts: Any) -> str:
+    """
+    ETag d'une réponse lue dans la base : change avec l'état de la base (_db_stamps),
+    l'hôte (les audio_url en dépendent), la requête ou les bornes résolues.
+    """
+    key = f"{stamps[0]}|{stamps[1]}|{request.host_url}|{request.full_path}|" + "|".join(str(p) for p in parts)
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+def _with_cache_headers(resp, etag: str, max_age: int):
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = max_age
+    return resp
+
+
+def _not_modified(etag: str, max_age: int):
+    """Réponse 304 si le client possède déjà cette version (If-None-Match), sinon None."""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return _with_cache_headers(app.response_class(status=304), etag, max_age)
+
+
+def _cached_json(body: bytes, etag: str, max_age: int):
+    """Corps JSON déjà encodé, avec ETag / Cache-Control et 304 si inchangé."""
+    return _not_modified(etag, max_age) or _with_cache_headers(_json_bytes(body), etag, max_age)
+
+
+def _stream_detections(items: list[dict], audio_url_prefix: str) -> Iterator[bytes]:
+    """
+    Tableau JSON de /api/detections émis par paquets (orjson) : pas de second
+    encodage complet de la liste, et le premier octet part plus tôt.
+    audio_url_prefix vide = clips non configurés (audio_url toujours "").
+    """
+    yield b"["
+    for start in range(0, len(items), DETECTIONS_STREAM_BATCH):
+        chunk = []
+        for it in items[start:start + DETECTIONS_STREAM_BATCH]:
+            it["audio_url"] = audio_url_prefix + it["id"] if audio_url_prefix and it["audio_path"] else ""
+            chunk.append(orjson.dumps(it))
+        if start:
+            yield b","
+        yield b",".join(chunk)
+    yield b"]"
+
+
 def _parse_date_range(period: Optional[str], date_start: Optional[str], date_end: Optional[str]):
     """
     Si period=week : semaine courante (lundi à aujourd'hui).
     Sinon retourne date_start et date_end tels quels.
     """
+    global _week_cache
     if (period or "").strip().lower() != "week":
         return date_start, date_end
     today = datetime.now().date()
+    cached_day, cached_week = _week_cache
+    if cached_day == today:
+        return cached_week
     # Lundi = premier jour de la semaine (isoweekday: 1=lundi, 7=dimanche)
     days_since_monday = today.isoweekday() - 1
     monday = today - timedelta(days=days_since_monday)
-    return monday.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")
+    week = (monday.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d"))
+    _week_cache = (today, week)
+    return week
 
 
 @app.route("/")
 def index():
+    global _index_cache
     base = request.host_url.rstrip("/")
+    birdnet_info = get_birdnet_config_info(BIRDNET_DB_PATH, BIRDNET_CONFIG_PATH)
+    key, body, etag = _index_cache
+    if key is not None and key[0] == base and key[1] is birdnet_info:
+        return _cached_json(body, etag, CONFIG_MAX_AGE)
     payload = {
         "service": "birdnet-api2ha",
         "description": "Pont BirdNET-Go vers Home Assistant (API REST + MQTT)",
@@ -101,11 +256,6 @@ def index():
             "stats": "date_start, date_end, period=week (semaine courante)",
         },
     }
-    cfg = get_config()
-    birdnet_info = get_birdnet_config_info(
-        cfg.get("database_path") or None,
-        (cfg.get("birdnet_config_path") or "").strip() or None,
-    )
     if birdnet_info:
         payload["database"] = {
             "type": birdnet_info["database_type"],
@@ -119,32 +269,43 @@ def index():
                 "port": birdnet_info["mysql"].get("port"),
                 "database": birdnet_info["mysql"].get("database"),
             }
-    return jsonify(payload)
+    body = orjson.dumps(payload)
+    etag = _body_etag(body)
+    _index_cache = ((base, birdnet_info), body, etag)
+    return _cached_json(body, etag, CONFIG_MAX_AGE)
 
 
-@app.route("/favicon.ico")
-def favicon():
-    return "", 204
+def _favicon_middleware(wsgi_app):
+    """Répond 204 à /favicon.ico au niveau WSGI, sans passer par le routage Flask."""
+    def middleware(environ, start_response):
+        if environ.get("PATH_INFO") == "/favicon.ico":
+            start_response("204 No Content", [("Content-Length", "0")])
+            return []
+        return wsgi_app(environ, start_response)
+    return middleware
+
+
+app.wsgi_app = _favicon_middleware(app.wsgi_app)
 
 
 @app.route("/health")
 def health():
-    return jsonify({"status": "healthy", "service": "birdnet-api2ha"})
+    return _json_bytes(_HEALTH_BODY)
 
 
 @app.route("/api/birdnet-config")
 def api_birdnet_config():
     """Infos lues depuis la config BirdNET-Go : type de base (SQLite/MySQL) et chemin/nom."""
-    cfg = get_config()
-    info = get_birdnet_config_info(
-        cfg.get("database_path") or None,
-        (cfg.get("birdnet_config_path") or "").strip() or None,
-    )
+    global _birdnet_config_cache
+    info = get_birdnet_config_info(BIRDNET_DB_PATH, BIRDNET_CONFIG_PATH)
     if info is None:
         return jsonify({
             "found": False,
             "message": "Config BirdNET-Go non trouvée. Indiquez birdnet_config_path dans config.yaml ou placez la DB dans un dossier connu.",
         }), 200
+    cached_info, body, etag = _birdnet_config_cache
+    if info is cached_info:
+        return _cached_json(body, etag, CONFIG_MAX_AGE)
     out = {
         "found": True,
         "database_type": info["database_type"],
@@ -154,14 +315,16 @@ def api_birdnet_config():
     }
     if info["database_type"] == "mysql":
         out["note"] = "MySQL détecté : lecture non supportée pour l'instant, seul SQLite est pris en charge."
-    return jsonify(out)
+    body = orjson.dumps(out)
+    etag = _body_etag(body)
+    _birdnet_config_cache = (info, body, etag)
+    return _cached_json(body, etag, CONFIG_MAX_AGE)
 
 
 @app.route("/api/detections")
 def api_detections():
-    cfg = get_config()
-    db_path = (cfg.get("database_path") or "").strip()
-    if not db_path or not os.path.isfile(db_path):
+    db_path = DB_PATH
+    if not db_path or not _db_exists(db_path):
         return jsonify([]), 200
     period = request.args.get("period") or None
     date_start, date_end = _parse_date_range(
@@ -169,15 +332,20 @@ def api_detections():
         request.args.get("date_start") or None,
         request.args.get("date_end") or None,
     )
+    etag = _db_etag(_db_stamps(db_path), date_start, date_end)
+    not_modified = _not_modified(etag, DETECTIONS_MAX_AGE)
+    if not_modified is not None:
+        return not_modified
     common_name = request.args.get("common_name") or None
     try:
         limit = min(int(request.args.get("limit", 100)), 500)
     except ValueError:
         limit = 100
     base_url = request.host_url.rstrip("/")
-    clips_base = cfg.get("clips_base_path") or ""
+    clips_base = CLIPS_BASE
+    audio_url_prefix = f"{base_url}/api/audio?id=" if base_url and clips_base else ""
     try:
-        with get_connection(db_path) as conn:
+        with shared_connection(db_path) as conn:
             items = get_detections_v2(
                 conn, date_start=date_start, date_end=date_end, common_name=common_name, limit=limit
             )
@@ -187,18 +355,16 @@ def api_detections():
         return jsonify({"error": str(e)}), 500
     except sqlite3.OperationalError as e:
         return jsonify({"error": f"Database error: {e}"}), 500
-    for it in items:
-        it["audio_url"] = ""
-        if it.get("audio_path") and base_url and clips_base:
-            it["audio_url"] = f"{base_url}/api/audio?id={it['id']}"
-    return jsonify(items)
+    resp = app.response_class(
+        _stream_detections(items, audio_url_prefix), mimetype="application/json"
+    )
+    return _with_cache_headers(resp, etag, DETECTIONS_MAX_AGE)
 
 
 @app.route("/api/stats")
 def api_stats():
-    cfg = get_config()
-    db_path = (cfg.get("database_path") or "").strip()
-    if not db_path or not os.path.isfile(db_path):
+    db_path = DB_PATH
+    if not db_path or not _db_exists(db_path):
         return jsonify([]), 200
     period = request.args.get("period") or None
     date_start, date_end = _parse_date_range(
@@ -206,27 +372,41 @@ def api_stats():
         request.args.get("date_start") or None,
         request.args.get("date_end") or None,
     )
-    try:
-        with get_connection(db_path) as conn:
-            items = get_stats_v2(conn, date_start=date_start, date_end=date_end)
-    except FileNotFoundError as e:
-        return jsonify({"error": str(e)}), 500
-    except SchemaError as e:
-        return jsonify({"error": str(e)}), 500
-    except sqlite3.OperationalError as e:
-        return jsonify({"error": f"Database error: {e}"}), 500
-    return jsonify(items)
+    stamps = _db_stamps(db_path)
+    etag = _db_etag(stamps, date_start, date_end)
+    not_modified = _not_modified(etag, STATS_CACHE_TTL)
+    if not_modified is not None:
+        return not_modified
+    key = (date_start, date_end, stamps)
+    now = time.monotonic()
+    cached = _stats_cache.get(key)
+    if cached is not None and cached[0] > now:
+        body = cached[1]
+    else:
+        try:
+            with shared_connection(db_path) as conn:
+                items = get_stats_v2(conn, date_start=date_start, date_end=date_end)
+        except FileNotFoundError as e:
+            return jsonify({"error": str(e)}), 500
+        except SchemaError as e:
+            return jsonify({"error": str(e)}), 500
+        except sqlite3.OperationalError as e:
+            return jsonify({"error": f"Database error: {e}"}), 500
+        body = orjson.dumps(items)
+        if len(_stats_cache) >= STATS_CACHE_MAX:
+            _stats_cache.clear()
+        _stats_cache[key] = (now + STATS_CACHE_TTL, body)
+    return _with_cache_headers(_json_bytes(body), etag, STATS_CACHE_TTL)
 
 
 @app.route("/api/hourly")
 def api_hourly():
     """Détections par espèce par heure pour une date donnée."""
-    cfg = get_config()
-    db_path = (cfg.get("database_path") or "").strip()
-    if not db_path or not os.path.isfile(db_path):
+    db_path = DB_PATH
+    if not db_path or not _db_exists(db_path):
         return jsonify({"date": "", "sunrise": None, "sunset": None, "species": []}), 200
     date_str = (request.args.get("date") or "").strip()
-    tz = _effective_timezone_for_hourly(cfg)
+    tz = HOURLY_TZ
     if not date_str:
         if tz:
             try:
@@ -235,30 +415,38 @@ def api_hourly():
                 date_str = datetime.now().strftime("%Y-%m-%d")
         else:
             date_str = datetime.now().strftime("%Y-%m-%d")
+    etag = _db_etag(_db_stamps(db_path), date_str, tz)
+    not_modified = _not_modified(etag, DETECTIONS_MAX_AGE)
+    if not_modified is not None:
+        return not_modified
     try:
-        with get_connection(db_path) as conn:
+        with shared_connection(db_path) as conn:
             data = get_hourly_detections(conn, date_str, timezone=tz)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    return jsonify(data)
+    return _with_cache_headers(jsonify(data), etag, DETECTIONS_MAX_AGE)
 
 
 @app.route("/api/aggregate")
 def api_aggregate():
     """Détections agrégées par jour/semaine/mois. ?mode=daily|weekly|monthly"""
-    cfg = get_config()
-    db_path = (cfg.get("database_path") or "").strip()
-    if not db_path or not os.path.isfile(db_path):
+    db_path = DB_PATH
+    if not db_path or not _db_exists(db_path):
         return jsonify({"mode": "", "columns": [], "species": []}), 200
     mode = request.args.get("mode", "daily").strip().lower()
     if mode not in ("daily", "weekly", "monthly"):
         return jsonify({"error": "mode doit être daily, weekly ou monthly"}), 400
+    # Fenêtre glissante relative à aujourd'hui : la date fait partie de l'ETag
+    etag = _db_etag(_db_stamps(db_path), mode, date.today())
+    not_modified = _not_modified(etag, STATS_CACHE_TTL)
+    if not_modified is not None:
+        return not_modified
     try:
-        with get_connection(db_path) as conn:
+        with shared_connection(db_path) as conn:
             data = get_aggregate_detections(conn, mode)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    return jsonify(data)
+    return _with_cache_headers(jsonify(data), etag, STATS_CACHE_TTL)
 
 
 @app.route("/api/system")
@@ -286,7 +474,7 @@ def api_system():
 
 
 def run_app():
-    cfg = load_config()
+    cfg = get_config()
     host = cfg.get("http_host", "0.0.0.0")
     port = int(cfg.get("http_port", 8081))
     _setup_cors()
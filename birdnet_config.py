@@ -2,18 +2,52 @@
 Lecture de la config BirdNET-Go pour afficher le type de base (SQLite/MySQL) et le chemin/nom.
 """
 import os
+import time
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML sans libyaml : parseur pur Python
+    from yaml import SafeLoader
+
 # Dossiers typiques pour chercher la config BirdNET-Go
+# (chaînes os.path plutôt que Path : pas d'objet créé à chaque sondage)
+_HOME = os.path.expanduser("~")
 SEARCH_DIRS = [
-    Path.home() / "birdnet-go-app",
-    Path.home() / "BirdNET-Go",
-    Path.cwd(),
+    os.path.join(_HOME, "birdnet-go-app"),
+    os.path.join(_HOME, "BirdNET-Go"),
+    os.getcwd(),
 ]
 CONFIG_NAMES = ["config.yaml", "config.yml"]
+# Emplacements candidats dans SEARCH_DIRS (d/ puis d/config/), dans l'ordre de recherche
+CONFIG_CANDIDATES = tuple(
+    os.path.join(base, name)
+    for d in SEARCH_DIRS
+    for name in CONFIG_NAMES
+    for base in (d, os.path.join(d, "config"))
+)
+
+# Cache de get_birdnet_config_info (appelé à chaque requête / et /api/birdnet-config) :
+# la recherche du fichier est refaite au plus toutes les CONFIG_INFO_TTL secondes,
+# et le YAML est relu dès que son mtime change.
+CONFIG_INFO_TTL = 60.0
+_info_cache: dict[tuple[str | None, str | None], tuple[float, Path | None, int | None, dict[str, Any] | None]] = {}
+
+
+@lru_cache(maxsize=8)
+def _db_config_candidates(database_path: str) -> tuple[str, ...]:
+    """Emplacements candidats autour de la base : parent et grand-parent, puis leur config/."""
+    db_dir = os.path.dirname(os.path.realpath(database_path))
+    return tuple(
+        os.path.join(sub, name)
+        for parent in (db_dir, os.path.dirname(db_dir))
+        for name in CONFIG_NAMES
+        for sub in (parent, os.path.join(parent, "config"))
+    )
 
 
 def find_birdnet_config_path(database_path: str | None = None) -> Path | None:
@@ -22,31 +56,26 @@ def find_birdnet_config_path(database_path: str | None = None) -> Path | None:
     Si database_path est fourni (ex. .../data/birdnet.db), cherche dans le parent et config/.
     Sinon cherche dans SEARCH_DIRS.
     """
-    if database_path:
-        db = Path(database_path).resolve()
-        if db.is_file():
-            # .../birdnet-go-app/data/birdnet.db -> .../birdnet-go-app/config/config.yaml
-            for parent in [db.parent, db.parent.parent]:
-                for name in CONFIG_NAMES:
-                    for sub in [parent, parent / "config"]:
-                        cfg = sub / name
-                        if cfg.is_file():
-                            return cfg
-    for d in SEARCH_DIRS:
-        if not d.is_dir():
-            continue
-        for name in CONFIG_NAMES:
-            for base in [d, d / "config"]:
-                cfg = base / name
-                if cfg.is_file():
-                    return cfg
+    # .../birdnet-go-app/data/birdnet.db -> .../birdnet-go-app/config/config.yaml
+    if database_path and os.path.isfile(database_path):
+        for cfg in _db_config_candidates(database_path):
+            if os.path.isfile(cfg):
+                return Path(cfg)
+    for cfg in CONFIG_CANDIDATES:
+        if os.path.isfile(cfg):
+            return Path(cfg)
     return None
 
 
 def load_birdnet_config(config_path: Path) -> dict[str, Any]:
-    """Charge le YAML BirdNET-Go."""
-    with open(config_path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    """Charge le YAML BirdNET-Go (parse réutilisé tant que le mtime ne change pas : ne pas modifier le dict)."""
+    return _load_yaml(str(config_path), os.stat(config_path).st_mtime_ns)
+
+
+@lru_cache(maxsize=8)
+def _load_yaml(path: str, mtime_ns: int) -> dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=SafeLoader) or {}
 
 
 def get_database_info(config_path: Path, data: dict[str, Any]) -> dict[str, Any]:
@@ -110,18 +139,43 @@ def get_database_info(config_path: Path, data: dict[str, Any]) -> dict[str, Any]
     return result
 
 
+def _mtime_ns(path: Path | None) -> int | None:
+    if path is None:
+        return None
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
 def get_birdnet_config_info(database_path: str | None = None, config_path_override: str | None = None) -> dict[str, Any] | None:
     """
     Point d'entrée: trouve la config BirdNET-Go, la charge et retourne les infos base.
     Si config_path_override est fourni, l'utilise en priorité.
     Retourne None si aucune config trouvée.
+    Le résultat est mis en cache (voir CONFIG_INFO_TTL) : ne pas le modifier.
     """
+    key = (database_path, config_path_override)
+    now = time.monotonic()
+    cached = _info_cache.get(key)
+    if cached is not None:
+        expires, path, mtime, info = cached
+        if now < expires and _mtime_ns(path) == mtime:
+            return info
+    path, info = _read_birdnet_config_info(database_path, config_path_override)
+    _info_cache[key] = (now + CONFIG_INFO_TTL, path, _mtime_ns(path), info)
+    return info
+
+
+def _read_birdnet_config_info(
+    database_path: str | None, config_path_override: str | None
+) -> tuple[Path | None, dict[str, Any] | None]:
     path = None
     if config_path_override and os.path.isfile(config_path_override):
         path = Path(config_path_override)
     if path is None:
         path = find_birdnet_config_path(database_path)
     if path is None:
-        return None
+        return None, None
     data = load_birdnet_config(path)
-    return get_database_info(path, data)
+    return path, get_database_info(path, data)
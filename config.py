@@ -2,6 +2,11 @@
 import os
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML sans libyaml
+    from yaml import SafeLoader
+
 CONFIG_PATH = os.environ.get("BIRDNET_API2HA_CONFIG", "config.yaml")
 
 
@@ -11,7 +16,7 @@ def load_config():
             f"Config not found: {CONFIG_PATH}. Copy config.yaml.example to config.yaml."
         )
     with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+        data = yaml.load(f, Loader=SafeLoader) or {}
     # Env overrides
     if os.environ.get("BIRDNET_API2HA_DB"):
         data["database_path"] = os.environ["BIRDNET_API2HA_DB"]
@@ -3,26 +3,40 @@
 Configuration interactive ou automatique pour birdnet-api2ha.
 Recherche la base BirdNET-Go et la config, pose des questions si besoin, écrit config.yaml.
 Option: configurer le démarrage automatique au boot (fichier systemd).
-Usage: python configure.py [--non-interactive]
+Usage: python configure.py [--non-interactive] [--index] [--canonical]
 """
 import argparse
 import getpass
+import json
+import os
+import shlex
+import sqlite3
+import string
 import subprocess
 import sys
 from pathlib import Path
 
 import yaml
 
-from birdnet_config import find_birdnet_config_path, get_birdnet_config_info
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:  # PyYAML sans libyaml
+    from yaml import SafeDumper
+
+from birdnet_config import find_birdnet_config_path, get_birdnet_config_info, load_birdnet_config
+from config import load_config
+from db import ensure_indexes, get_connection
 
 # Dossiers typiques où chercher birdnet.db ou config BirdNET-Go
+# (chaînes os.path : les sondages se font avec os.path.isfile, sans objets Path)
+_HOME = os.path.expanduser("~")
 SEARCH_DIRS = [
-    Path.home() / "birdnet-go-app" / "data",
-    Path.home() / "BirdNET-Go",
-    Path.home() / "birdnet-go-app",
-    Path.cwd(),
-    Path.cwd() / "data",
-    Path("/opt") / "birdnet-go",
+    os.path.join(_HOME, "birdnet-go-app", "data"),
+    os.path.join(_HOME, "BirdNET-Go"),
+    os.path.join(_HOME, "birdnet-go-app"),
+    os.getcwd(),
+    os.path.join(os.getcwd(), "data"),
+    os.path.join("/opt", "birdnet-go"),
 ]
 
 # Noms de fichiers DB possibles
@@ -31,66 +45,69 @@ DB_NAMES = ["birdnet.db", "birdnet_v2.db"]
 # Fichier config BirdNET-Go (pour en extraire le chemin SQLite et clips)
 BIRDNET_CONFIG_NAMES = ["config.yaml", "config.yml"]
 
+# Noms d'entrée retenus lors du parcours de SEARCH_DIRS
+_SCAN_NAMES = frozenset(DB_NAMES) | frozenset(BIRDNET_CONFIG_NAMES) | {"config"}
 
-def find_birdnet_config_dirs() -> list[Path]:
-    """Retourne les dossiers contenant un config.yaml (config BirdNET-Go)."""
-    found = []
-    for d in SEARCH_DIRS:
-        if not d.is_dir():
-            continue
-        for name in BIRDNET_CONFIG_NAMES:
-            cfg = d / name
-            if cfg.is_file():
-                found.append(d)
-                break
-            # config peut être dans un sous-dossier "config"
-            cfg2 = d / "config" / name
-            if cfg2.is_file():
-                found.append(d)
-                break
-    return found
-
-
-def find_database_files() -> list[Path]:
-    """Retourne tous les birdnet.db trouvés dans les dossiers de recherche."""
-    found = []
+
+def _config_file_in(entries: dict[str, os.DirEntry]) -> bool:
+    return any(
+        name in entries and entries[name].is_file() for name in BIRDNET_CONFIG_NAMES
+    )
+
+
+def _scan_search_dirs() -> tuple[list[Path], list[Path]]:
+    """
+    Un seul os.scandir par dossier de SEARCH_DIRS (plus celui de config/ au besoin).
+    Retourne (bases birdnet.db trouvées, dossiers contenant une config BirdNET-Go).
+    DirEntry.is_file()/is_dir() réutilisent le type lu avec la liste du dossier :
+    pas de stat par nom candidat. Les bases sont dédupliquées par chemin réel.
+    """
+    db_files: dict[str, None] = {}
+    config_dirs: list[Path] = []
     for d in SEARCH_DIRS:
-        if not d.is_dir():
+        try:
+            with os.scandir(d) as it:
+                entries = {e.name: e for e in it if e.name in _SCAN_NAMES}
+        except OSError:
             continue
         for name in DB_NAMES:
-            db = d / name
-            if db.is_file():
-                found.append(db.resolve())
-    # Dédupliquer (même fichier via chemins différents)
-    seen = set()
-    unique = []
-    for p in found:
-        key = p.resolve()
-        if key not in seen:
-            seen.add(key)
-            unique.append(p)
-    return unique
+            entry = entries.get(name)
+            if entry is not None and entry.is_file():
+                db_files.setdefault(os.path.realpath(entry.path))
+        has_config = _config_file_in(entries)
+        # config peut être dans un sous-dossier "config"
+        sub = entries.get("config")
+        if not has_config and sub is not None and sub.is_dir():
+            try:
+                with os.scandir(sub.path) as it:
+                    has_config = _config_file_in({e.name: e for e in it})
+            except OSError:
+                pass
+        if has_config:
+            config_dirs.append(Path(d))
+    return [Path(p) for p in db_files], config_dirs
 
 
 def read_birdnet_config(config_dir: Path) -> dict:
-    """Lit la config BirdNET-Go pour extraire database path et clips path."""
+    """
+    Lit la config BirdNET-Go pour extraire database path et clips path.
+    Le parse est mis en cache par load_birdnet_config (chemin, mtime) : une relecture
+    du même fichier ne le reparse pas.
+    """
     data = {}
     for name in BIRDNET_CONFIG_NAMES:
         for base in [config_dir, config_dir / "config"]:
             cfg = base / name
             if cfg.is_file():
                 try:
-                    with open(cfg, "r", encoding="utf-8") as f:
-                        data = yaml.safe_load(f) or {}
-                    return data
+                    return load_birdnet_config(cfg)
                 except Exception:
                     pass
     return data
 
 
-def get_sqlite_path_from_birdnet_config(config_dir: Path) -> Path | None:
-    """Extrait le chemin de la base SQLite depuis la config BirdNET-Go."""
-    data = read_birdnet_config(config_dir)
+def _sqlite_path_from(data: dict, config_dir: Path) -> Path | None:
+    """Extrait le chemin de la base SQLite d'une config BirdNET-Go déjà lue."""
     path = (data.get("output") or {}).get("sqlite", {}).get("path")
     if not path:
         return None
@@ -107,9 +124,8 @@ def get_sqlite_path_from_birdnet_config(config_dir: Path) -> Path | None:
     return p
 
 
-def get_clips_path_from_birdnet_config(config_dir: Path) -> Path | None:
-    """Extrait le chemin des clips depuis la config BirdNET-Go."""
-    data = read_birdnet_config(config_dir)
+def _clips_path_from(data: dict, config_dir: Path) -> Path | None:
+    """Extrait le chemin des clips d'une config BirdNET-Go déjà lue."""
     export = (data.get("realtime") or {}).get("audio", {}).get("export", {})
     path = export.get("path")
     if not path:
@@ -126,55 +142,83 @@ def get_clips_path_from_birdnet_config(config_dir: Path) -> Path | None:
     return p
 
 
+def _paths_from_birdnet_configs(config_dirs: list[Path]) -> tuple[list[Path], Path | None]:
+    """
+    Une seule lecture par config BirdNET-Go : bases SQLite déclarées (dans l'ordre)
+    et premier chemin de clips trouvé.
+    """
+    db_paths: list[Path] = []
+    clips_path = None
+    for cdir in config_dirs:
+        data = read_birdnet_config(cdir)
+        db_from_config = _sqlite_path_from(data, cdir)
+        if db_from_config:
+            db_paths.append(db_from_config)
+        if clips_path is None:
+            clips_path = _clips_path_from(data, cdir)
+    return db_paths, clips_path
+
+
+def _merge_db_paths(db_files: list[Path], dbs_from_config: list[Path]) -> list[Path]:
+    """
+    Bases trouvées par le scan puis celles des configs, sans doublon. Les chemins du scan
+    sont déjà résolus (realpath) ; ceux des configs le sont ici, une fois chacun.
+    """
+    merged = dict.fromkeys(map(str, db_files))
+    merged.update(dict.fromkeys(os.path.realpath(p) for p in dbs_from_config))
+    return [Path(p) for p in merged]
+
+
 SYSTEMD_SERVICE_NAME = "birdnet-api2ha"
-SYSTEMD_UNIT_TEMPLATE = """[Unit]
+SYSTEMD_UNIT_TEMPLATE = string.Template("""[Unit]
 Description=BirdNET-Go API to Home Assistant (birdnet-api2ha)
 After=network-online.target
 Wants=network-online.target
 
 [Service]
 Type=simple
-User={user}
-Group={group}
-WorkingDirectory={workdir}
+User=$user
+Group=$group
+WorkingDirectory=$workdir
 
 # Python du venv (pas besoin d'activer le venv)
-ExecStart={python_path} main.py{mqtt_flag}
+ExecStart=$python_path main.py$mqtt_flag
 Restart=always
 RestartSec=10
 Environment=PYTHONUNBUFFERED=1
 
 [Install]
 WantedBy=multi-user.target
-"""
+""")
 
 
 def generate_systemd_unit(project_dir: Path, user: str, with_mqtt: bool) -> str:
     """Génère le contenu du fichier unit systemd (utilise toujours venv/bin/python)."""
+    workdir = project_dir.resolve()
     # Sous Linux/Raspberry le venv expose venv/bin/python
-    python_path = project_dir / "venv" / "bin" / "python"
+    python_path = workdir / "venv" / "bin" / "python"
     mqtt_flag = " --mqtt" if with_mqtt else ""
-    return SYSTEMD_UNIT_TEMPLATE.format(
+    return SYSTEMD_UNIT_TEMPLATE.substitute(
         user=user,
         group=user,
-        workdir=str(project_dir.resolve()),
-        python_path=str(python_path.resolve()),
+        workdir=str(workdir),
+        python_path=str(python_path),
         mqtt_flag=mqtt_flag,
     )
 
 
 def install_systemd_service(service_path: Path) -> bool:
     """Copie le fichier service vers /etc/systemd/system/ et active le service. Nécessite sudo."""
+    # Un seul sudo (une seule authentification) pour toute la séquence
+    service = shlex.quote(SYSTEMD_SERVICE_NAME)
+    script = (
+        f"cp {shlex.quote(str(service_path))} /etc/systemd/system/{service}.service"
+        " && systemctl daemon-reload"
+        f" && systemctl enable {service}"
+        f" && systemctl start {service}"
+    )
     try:
-        subprocess.run(
-            ["sudo", "cp", str(service_path), f"/etc/systemd/system/{SYSTEMD_SERVICE_NAME}.service"],
-            check=True,
-            capture_output=True,
-            text=True,
-        )
-        subprocess.run(["sudo", "systemctl", "daemon-reload"], check=True, capture_output=True)
-        subprocess.run(["sudo", "systemctl", "enable", SYSTEMD_SERVICE_NAME], check=True, capture_output=True)
-        subprocess.run(["sudo", "systemctl", "start", SYSTEMD_SERVICE_NAME], check=True, capture_output=True)
+        subprocess.run(["sudo", "sh", "-c", script], check=True, capture_output=True, text=True)
         return True
     except (subprocess.CalledProcessError, FileNotFoundError):
         return False
@@ -185,14 +229,13 @@ def run_interactive() -> dict:
     print("=== birdnet-api2ha - Configuration ===\n")
 
     # 1) Recherche des bases
-    db_files = find_database_files()
-    config_dirs = find_birdnet_config_dirs()
+    db_files, config_dirs = _scan_search_dirs()
 
-    # Enrichir avec les chemins lus depuis les configs BirdNET-Go
-    for cdir in config_dirs:
-        db_from_config = get_sqlite_path_from_birdnet_config(cdir)
-        if db_from_config and db_from_config not in db_files:
-            db_files.append(db_from_config)
+    # Enrichir avec les chemins lus depuis les configs BirdNET-Go (clips au passage)
+    clips_from_config = None
+    if config_dirs:
+        dbs_from_config, clips_from_config = _paths_from_birdnet_configs(config_dirs)
+        db_files = _merge_db_paths(db_files, dbs_from_config)
 
     if not db_files:
         print("Aucune base BirdNET-Go (birdnet.db) trouvée.")
@@ -218,14 +261,11 @@ def run_interactive() -> dict:
             except (ValueError, IndexError):
                 db_path = str(db_files[0])
 
-        # Clips: chercher depuis une config BirdNET-Go
+        # Clips: chemin lu dans une config BirdNET-Go
         clips_path = ""
-        for cdir in config_dirs:
-            clips_path_candidate = get_clips_path_from_birdnet_config(cdir)
-            if clips_path_candidate:
-                clips_path = str(clips_path_candidate)
-                print(f"Chemin clips (depuis config BirdNET-Go): {clips_path}")
-                break
+        if clips_from_config:
+            clips_path = str(clips_from_config)
+            print(f"Chemin clips (depuis config BirdNET-Go): {clips_path}")
         if not clips_path:
             default_clips = str(Path(db_path).parent / "clips")
             clips_path = input(f"Chemin des clips (optionnel) [{default_clips}]: ").strip()
@@ -314,25 +354,19 @@ def run_interactive() -> dict:
 
 def run_non_interactive() -> dict:
     """Configuration automatique sans questions (utilise la première base trouvée)."""
-    db_files = find_database_files()
-    config_dirs = find_birdnet_config_dirs()
-    for cdir in config_dirs:
-        db_from_config = get_sqlite_path_from_birdnet_config(cdir)
-        if db_from_config and db_from_config not in db_files:
-            db_files.append(db_from_config)
+    db_files, config_dirs = _scan_search_dirs()
+    clips_from_config = None
+    if config_dirs:
+        dbs_from_config, clips_from_config = _paths_from_birdnet_configs(config_dirs)
+        db_files = _merge_db_paths(db_files, dbs_from_config)
 
     if not db_files:
         raise FileNotFoundError(
             "Aucune base birdnet.db trouvée. Lancez sans --non-interactive pour saisir le chemin."
         )
     db_path = str(db_files[0])
-    clips_path = ""
-    for cdir in config_dirs:
-        clips_path_candidate = get_clips_path_from_birdnet_config(cdir)
-        if clips_path_candidate:
-            clips_path = str(clips_path_candidate)
-            break
-    if not clips_path and db_files:
+    clips_path = str(clips_from_config) if clips_from_config else ""
+    if not clips_path:
         candidate = Path(db_path).parent / "clips"
         if candidate.is_dir():
             clips_path = str(candidate)
@@ -360,6 +394,57 @@ def run_non_interactive() -> dict:
     }
 
 
+def create_indexes() -> None:
+    """Ajoute les index utiles à l'API dans la base BirdNET-Go (database_path de config.yaml)."""
+    try:
+        db_path = (load_config().get("database_path") or "").strip()
+    except FileNotFoundError as e:
+        print(f"Erreur: {e}")
+        sys.exit(1)
+    if not db_path:
+        print("Erreur: database_path vide dans config.yaml.")
+        sys.exit(1)
+    try:
+        with get_connection(db_path, read_only=False) as conn:
+            created = ensure_indexes(conn)
+    except (FileNotFoundError, sqlite3.Error) as e:
+        print(f"Erreur: {e}")
+        sys.exit(1)
+    if created:
+        print(f"Index créés dans {db_path}: {', '.join(created)}")
+    else:
+        print(f"Aucun index à créer dans {db_path}.")
+
+
+def _yaml_str(s: str) -> str:
+    if s.isprintable():
+        return json.dumps(s, ensure_ascii=False)
+    return yaml.dump(
+        s, Dumper=SafeDumper, default_style='"', allow_unicode=True, width=2**31 - 1
+    ).rstrip("\n")
+
+
+def _render_config(cfg: dict, indent: str = "") -> str:
+    """
+    YAML de config.yaml écrit à la main (schéma connu : chaînes, nombres, booléens, sous-dicts).
+    Chaînes entre guillemets via json.dumps : un scalaire JSON entre guillemets est du YAML valide,
+    sauf caractères non imprimables (DEL, NEL, U+2028...) : ceux-là passent par yaml.dump.
+    """
+    lines = []
+    for key, value in cfg.items():
+        if isinstance(value, dict):
+            lines.append(f"{indent}{key}:\n{_render_config(value, indent + '  ')}")
+        elif isinstance(value, bool):
+            lines.append(f"{indent}{key}: {'true' if value else 'false'}\n")
+        elif isinstance(value, (int, float)):
+            lines.append(f"{indent}{key}: {value!r}\n")
+        elif value is None:
+            lines.append(f"{indent}{key}: null\n")
+        else:
+            lines.append(f"{indent}{key}: {_yaml_str(str(value))}\n")
+    return "".join(lines)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Configurer birdnet-api2ha (recherche DB et config)")
     parser.add_argument(
@@ -372,8 +457,22 @@ def main():
         default="config.yaml",
         help="Fichier de sortie (défaut: config.yaml)",
     )
+    parser.add_argument(
+        "--canonical",
+        action="store_true",
+        help="Écrire config.yaml avec yaml.dump (sortie PyYAML) au lieu du rendu intégré",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Créer les index manquants dans la base de config.yaml (écriture dans la base BirdNET-Go), puis quitter",
+    )
     args = parser.parse_args()
 
+    if args.index:
+        create_indexes()
+        return
+
     try:
         if args.non_interactive:
             config = run_non_interactive()
@@ -385,8 +484,14 @@ def main():
         sys.exit(1)
 
     out_path = Path(args.output)
-    with open(out_path, "w", encoding="utf-8") as f:
-        yaml.dump(config, f, default_flow_style=False, allow_unicode=True, sort_keys=False)
+    with open(out_path, "wb") as f:
+        if args.canonical:
+            yaml.dump(
+                config, f, Dumper=SafeDumper, encoding="utf-8",
+                default_flow_style=False, allow_unicode=True, sort_keys=False,
+            )
+        else:
+            f.write(_render_config(config).encode("utf-8"))
     print(f"\nConfig enregistrée: {out_path.resolve()}")
     print("Lancez: python main.py   ou   python main.py --mqtt")
 
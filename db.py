@@ -2,12 +2,17 @@
 Read-only access to BirdNET-Go SQLite database.
 Supports v2 schema (detections+labels) and legacy schema (notes).
 """
+import os
 import sqlite3
+import sys
+import threading
+from calendar import monthrange
 from collections import defaultdict
 from contextlib import contextmanager
 from datetime import date as date_type
 from datetime import datetime, time, timedelta
 from pathlib import Path
+from time import mktime
 from typing import Any, Generator, Optional
 
 try:
@@ -16,42 +21,266 @@ except ImportError:  # Python < 3.9 (non prévu ici)
     ZoneInfo = None  # type: ignore
 
 
-def _db_uri(db_path: str) -> str:
-    """Build SQLite URI for read-only (works on Windows and Linux)."""
+class _Connection(sqlite3.Connection):
+    """
+    Connexion qui mémorise ce qui a été lu du schéma (detect_schema, colonne de nom
+    des labels) : il ne change pas pendant la durée de vie d'une connexion.
+    """
+    schema: Optional[str] = None
+    label_name_sql: Optional[dict[str, str]] = None
+    # Le SQLite de ce processus sait-il interroger labels_fts (FTS5 + trigram) ?
+    fts5_trigram: Optional[bool] = None
+    # (st_dev, st_ino) du fichier ouvert : détecte une base remplacée (os.replace, restauration)
+    file_id: Optional[tuple[int, int]] = None
+
+
+def _db_uri(db_path: str, read_only: bool = True) -> str:
+    """Build SQLite URI, read-only by default (works on Windows and Linux)."""
     p = Path(db_path).resolve()
     if not p.is_file():
         raise FileNotFoundError(f"Database file not found: {p}")
     # file:///C:/path (Windows) or file:///home/... (Linux)
     uri = p.as_uri()
-    return f"{uri}?mode=ro"
+    return f"{uri}?mode={'ro' if read_only else 'rw'}"
 
 
-@contextmanager
-def get_connection(db_path: str) -> Generator[sqlite3.Connection, None, None]:
-    uri = _db_uri(db_path)
-    conn = sqlite3.connect(uri, uri=True)
+# Réglages de lecture (lectures mmap, gros cache de pages), envoyés en un seul script
+# à l'ouverture. La base appartient à BirdNET-Go : journal_mode n'est pas modifié.
+READ_PRAGMAS = """
+    PRAGMA query_only=1;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-65536;
+"""
+
+
+def _connect(
+    db_path: str, check_same_thread: bool = True, read_only: bool = True
+) -> sqlite3.Connection:
+    """
+    Ouvre la base en autocommit (pas de BEGIN implicite). En lecture seule (cas normal),
+    applique READ_PRAGMAS ; l'écriture ne sert qu'à ensure_indexes (configure.py --index).
+    """
+    file_id = _file_id(db_path)
+    conn = sqlite3.connect(
+        _db_uri(db_path, read_only),
+        uri=True,
+        isolation_level=None,
+        check_same_thread=check_same_thread,
+        factory=_Connection,
+    )
     conn.row_factory = sqlite3.Row
+    conn.file_id = file_id
+    if read_only:
+        conn.executescript(READ_PRAGMAS)
+    return conn
+
+
+def _file_id(db_path: str) -> Optional[tuple[int, int]]:
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def database_replaced(conn: sqlite3.Connection, db_path: str) -> bool:
+    """
+    Le fichier db_path n'est plus celui ouvert par conn (remplacé ou supprimé) ?
+    SQLite continue alors à lire l'ancien inode sans erreur : il faut rouvrir.
+    """
+    return getattr(conn, "file_id", None) != _file_id(db_path)
+
+
+@contextmanager
+def get_connection(db_path: str, read_only: bool = True) -> Generator[sqlite3.Connection, None, None]:
+    conn = _connect(db_path, read_only=read_only)
     try:
         yield conn
     finally:
         conn.close()
 
 
-def _row_to_dict(row: sqlite3.Row) -> dict[str, Any]:
-    return dict(row) if row else {}
+# Connexions partagées de l'API HTTP : une par base, gardée ouverte entre les requêtes.
+_shared_connections: dict[str, sqlite3.Connection] = {}
+_shared_lock = threading.Lock()
+
+
+@contextmanager
+def shared_connection(db_path: str) -> Generator[sqlite3.Connection, None, None]:
+    """
+    Connexion en lecture seule réutilisée d'une requête à l'autre (pas de réouverture
+    ni de rechargement du schéma à chaque appel). Le serveur Flask étant multi-thread,
+    l'accès est sérialisé par un verrou. Rouverte si le fichier a été remplacé (autre
+    inode au même chemin) ; sur erreur SQLite, fermée et rouverte au prochain appel.
+    """
+    with _shared_lock:
+        conn = _shared_connections.get(db_path)
+        if conn is not None and database_replaced(conn, db_path):
+            del _shared_connections[db_path]
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = _connect(db_path, check_same_thread=False)
+            _shared_connections[db_path] = conn
+            _warn_if_unindexed(conn)
+        try:
+            yield conn
+        except sqlite3.DatabaseError:
+            del _shared_connections[db_path]
+            conn.close()
+            raise
+
+
+# Index utiles aux requêtes v2 : (nom, colonnes de tête, CREATE INDEX)
+V2_INDEXES = (
+    (
+        "idx_det_detected_at",
+        ("detected_at",),
+        "CREATE INDEX IF NOT EXISTS idx_det_detected_at ON detections(detected_at DESC)",
+    ),
+    (
+        "idx_det_label_detected_at",
+        ("label_id", "detected_at"),
+        "CREATE INDEX IF NOT EXISTS idx_det_label_detected_at ON detections(label_id, detected_at DESC)",
+    ),
+)
+
+
+def _index_column_prefixes(conn: sqlite3.Connection, table: str) -> set[tuple[str, ...]]:
+    """Tous les préfixes de colonnes des index existants de table (ex. (a,), (a, b))."""
+    prefixes: set[tuple[str, ...]] = set()
+    for idx in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        cols = [r[2] for r in conn.execute(f'PRAGMA index_info("{idx[1]}")').fetchall()]
+        for n in range(1, len(cols) + 1):
+            prefixes.add(tuple(cols[:n]))
+    return prefixes
+
+
+def ensure_indexes(conn: sqlite3.Connection) -> list[str]:
+    """
+    Crée les index V2_INDEXES absents (connexion en écriture, schéma v2), sans doubler
+    un index existant qui couvre déjà les mêmes colonnes. Retourne les noms créés.
+    """
+    if detect_schema(conn) != "v2":
+        return []
+    existing = _index_column_prefixes(conn, "detections")
+    created = []
+    for name, columns, sql in V2_INDEXES:
+        if columns in existing:
+            continue
+        conn.execute(sql)
+        created.append(name)
+    if _ensure_labels_fts(conn):
+        created.append("labels_fts")
+    return created
+
+
+def _ensure_labels_fts(conn: sqlite3.Connection) -> bool:
+    """
+    Crée (ou reconstruit si périmé) l'index plein texte labels_fts sur labels.scientific_name.
+    Tokenizer trigram : MATCH "texte" trouve toute sous-chaîne, comme LIKE '%texte%'.
+    Pas de triggers sur labels (la table appartient à BirdNET-Go, dont le SQLite n'a pas
+    forcément FTS5) : un index périmé est ignoré par la lecture, relancer --index.
+    Retourne True si l'index a été créé ou reconstruit.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='labels_fts'"
+    ).fetchone()
+    try:
+        if not exists:
+            conn.execute(
+                "CREATE VIRTUAL TABLE labels_fts USING fts5("
+                "scientific_name, content='labels', content_rowid='id', tokenize='trigram')"
+            )
+        elif _labels_fts_current(conn):
+            return False
+        conn.execute("INSERT INTO labels_fts(labels_fts) VALUES('rebuild')")
+    except sqlite3.OperationalError:
+        # SQLite sans FTS5 ou sans tokenizer trigram (< 3.34) : filtre LIKE conservé
+        return False
+    return True
+
+
+def _labels_fts_current(conn: sqlite3.Connection) -> bool:
+    """labels_fts couvre-t-il toutes les lignes de labels (même nombre, même id max) ?"""
+    row = conn.execute(
+        "SELECT (SELECT count(*) FROM labels_fts_docsize) = (SELECT count(*) FROM labels)"
+        " AND (SELECT max(id) FROM labels_fts_docsize) IS (SELECT max(id) FROM labels)"
+    ).fetchone()
+    return bool(row[0])
+
+
+def _has_labels_fts(conn: sqlite3.Connection) -> bool:
+    """
+    labels_fts utilisable pour le filtre de nom. Présence et fraîcheur revérifiées à chaque
+    appel (quelques agrégats) : une espèce ajoutée par BirdNET-Go repasse aussitôt par LIKE,
+    un --index lancé pendant que l'API tourne sert tout de suite. Seule la prise en charge
+    de FTS5 par le SQLite local est mémorisée sur la connexion.
+    """
+    try:
+        if not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='labels_fts'"
+        ).fetchone() or not _labels_fts_current(conn):
+            return False
+    except sqlite3.OperationalError:
+        return False
+    supported = getattr(conn, "fts5_trigram", None)
+    if supported is None:
+        try:
+            conn.execute("SELECT rowid FROM labels_fts WHERE labels_fts MATCH '\"abc\"' LIMIT 1")
+            supported = True
+        except sqlite3.OperationalError:
+            supported = False
+        if isinstance(conn, _Connection):
+            conn.fts5_trigram = supported
+    return supported
+
+
+def _warn_if_unindexed(conn: sqlite3.Connection) -> None:
+    """Avertit (une fois par connexion) si les filtres sur detected_at parcourent toute la table."""
+    if detect_schema(conn) != "v2":
+        return
+    plan = conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM detections WHERE detected_at >= ? ORDER BY detected_at DESC",
+        [0],
+    ).fetchall()
+    if any(str(r[-1]).startswith("SCAN") and "detections" in str(r[-1]) for r in plan):
+        print(
+            "Attention: pas d'index sur detections.detected_at, les requêtes parcourent toute la table. "
+            "Voir: python configure.py --index",
+            file=sys.stderr,
+        )
+
+
+def _plain_cursor(conn: sqlite3.Connection) -> sqlite3.Cursor:
+    """Curseur sans row_factory : lignes en tuples, dépaquetées par position (pas de dict par ligne)."""
+    cur = conn.cursor()
+    cur.row_factory = None
+    return cur
 
 
 def detect_schema(conn: sqlite3.Connection) -> str:
-    """Return 'v2' if detections+labels exist, else 'legacy' or 'unknown'."""
+    """
+    Return 'v2' if detections+labels exist, else 'legacy' or 'unknown'.
+    v2/legacy sont mémorisés sur la connexion ; 'unknown' non (tables créées plus tard par BirdNET-Go).
+    """
+    schema = getattr(conn, "schema", None)
+    if schema is not None:
+        return schema
     cur = conn.execute(
         "SELECT name FROM sqlite_master WHERE type='table' AND name IN ('detections','labels','notes')"
     )
     tables = {r[0] for r in cur.fetchall()}
     if "detections" in tables and "labels" in tables:
-        return "v2"
-    if "notes" in tables:
-        return "legacy"
-    return "unknown"
+        schema = "v2"
+    elif "notes" in tables:
+        schema = "legacy"
+    else:
+        return "unknown"
+    if isinstance(conn, _Connection):
+        conn.schema = schema
+    return schema
 
 
 class SchemaError(Exception):
@@ -63,7 +292,20 @@ def _label_preferred_name_sql(conn: sqlite3.Connection, alias: str = "l") -> str
     """
     Expression SQL pour le nom « commun » / localisé dans labels (schéma v2).
     BirdNET-Go peut exposer common_name, name, label, etc. selon la version.
+    Résultat mémorisé sur les connexions _Connection.
     """
+    cached = getattr(conn, "label_name_sql", None)
+    if cached is not None and alias in cached:
+        return cached[alias]
+    expr = _label_preferred_name_expr(conn, alias)
+    if isinstance(conn, _Connection):
+        if conn.label_name_sql is None:
+            conn.label_name_sql = {}
+        conn.label_name_sql[alias] = expr
+    return expr
+
+
+def _label_preferred_name_expr(conn: sqlite3.Connection, alias: str) -> str:
     rows = conn.execute("PRAGMA table_info(labels)").fetchall()
     col_by_lower = {str(r[1]).lower(): str(r[1]) for r in rows}
     candidates = (
@@ -99,8 +341,11 @@ def _local_day_unix_range(tz_name: str, date_str: str) -> tuple[int, int]:
 
 def _hourly_v2_with_timezone(
     conn: sqlite3.Connection, date_str: str, tz_name: str
-) -> list[dict[str, Any]]:
-    """Une ligne par détection ; agrégation par heure locale IANA (pas SQLite localtime)."""
+) -> list[tuple[str, str, int, int, str]]:
+    """
+    Une ligne par détection ; agrégation par heure locale IANA (pas SQLite localtime).
+    Retourne (scientific_name, common_name, hour, count, image_url), comme les requêtes SQL horaires.
+    """
     if ZoneInfo is None:
         raise RuntimeError("zoneinfo indisponible")
     tz = ZoneInfo(tz_name.strip())
@@ -116,55 +361,74 @@ def _hourly_v2_with_timezone(
         LEFT JOIN image_caches ic ON ic.label_id = l.id
         WHERE d.detected_at >= ? AND d.detected_at < ?
     """
-    rows = conn.execute(sql, [start_ts, end_ts]).fetchall()
+    rows = _plain_cursor(conn).execute(sql, [start_ts, end_ts]).fetchall()
 
     # (scientific_name, hour) -> count ; common_name et image par espèce
     counts: dict[tuple[str, int], int] = defaultdict(int)
     meta: dict[str, dict[str, str]] = {}
+    day = date_type.fromisoformat(date_str)
 
-    for row in rows:
-        r = _row_to_dict(row)
-        ts = r.get("detected_at")
-        if ts is None:
+    for name, common_name, ts, image_url in rows:
+        if ts is None or not name:
             continue
         try:
             local_dt = datetime.fromtimestamp(int(ts), tz=tz)
         except (ValueError, OSError, OverflowError):
             continue
-        if local_dt.date() != date_type.fromisoformat(date_str):
+        if local_dt.date() != day:
             continue
-        hour = local_dt.hour
-        name = r.get("scientific_name") or ""
-        if not name:
-            continue
-        counts[(name, hour)] += 1
-        if name not in meta:
+        counts[(name, local_dt.hour)] += 1
+        m = meta.get(name)
+        if m is None:
             meta[name] = {
-                "common_name": (r.get("common_name") or "").strip() or name,
-                "image_url": (r.get("image_url") or "").strip(),
+                "common_name": (common_name or "").strip() or name,
+                "image_url": (image_url or "").strip(),
             }
         else:
-            if not meta[name]["image_url"] and r.get("image_url"):
-                meta[name]["image_url"] = (r.get("image_url") or "").strip()
-            cn = (r.get("common_name") or "").strip()
-            if cn and meta[name]["common_name"] == name:
-                meta[name]["common_name"] = cn
+            if not m["image_url"] and image_url:
+                m["image_url"] = image_url.strip()
+            cn = (common_name or "").strip()
+            if cn and m["common_name"] == name:
+                m["common_name"] = cn
 
-    out: list[dict[str, Any]] = []
+    out: list[tuple[str, str, int, int, str]] = []
     for (sci, hour), cnt in counts.items():
-        m = meta.get(sci, {"common_name": sci, "image_url": ""})
-        out.append(
-            {
-                "scientific_name": sci,
-                "common_name": m["common_name"],
-                "hour": hour,
-                "count": cnt,
-                "image_url": m["image_url"],
-            }
-        )
+        m = meta[sci]
+        out.append((sci, m["common_name"], hour, cnt, m["image_url"]))
     return out
 
 
+def _local_unix(date_str: str, hour: int, minute: int, second: int) -> int:
+    """Timestamp Unix de YYYY-MM-DD hh:mm:ss en heure locale (ValueError si la date est invalide)."""
+    y, m, d = (int(x) for x in date_str.split("-"))
+    if not (1 <= m <= 12 and 1 <= d <= monthrange(y, m)[1]):
+        raise ValueError(f"invalid date: {date_str!r}")
+    # tm_isdst=-1 : la libc choisit heure d'été / d'hiver pour cette date
+    return int(mktime((y, m, d, hour, minute, second, 0, 0, -1)))
+
+
+def _unix_date_range(
+    date_start: Optional[str], date_end: Optional[str]
+) -> tuple[Optional[int], Optional[int]]:
+    """
+    Bornes Unix [date_start 00:00:00, date_end 23:59:59] en heure locale du serveur
+    (même sens que datetime.strptime(...).timestamp(), sans objet datetime).
+    Une date absente ou invalide donne None (pas de filtre sur cette borne).
+    """
+    start_ts, end_ts = None, None
+    if date_start:
+        try:
+            start_ts = _local_unix(date_start, 0, 0, 0)
+        except (ValueError, OverflowError):
+            pass
+    if date_end:
+        try:
+            end_ts = _local_unix(date_end, 23, 59, 59)
+        except (ValueError, OverflowError):
+            pass
+    return start_ts, end_ts
+
+
 def _parse_legacy_datetime(date_str: str, time_str: str) -> str:
     """Build ISO timestamp from notes date (YYYY-MM-DD) and time (HH:MM:SS or similar)."""
     if not date_str:
@@ -188,6 +452,7 @@ def get_detections_legacy(
     common_name: Optional[str] = None,
     limit: int = 100,
     after_id: Optional[int] = None,
+    oldest_first: bool = False,
 ) -> list[dict]:
     """Query detections from legacy notes table. Same JSON shape as v2."""
     sql = """
@@ -211,27 +476,22 @@ def get_detections_legacy(
         params.append(f"%{common_name}%")
         params.append(f"%{common_name}%")
     if after_id is not None:
-        sql += " AND id > ?"
+        sql += " AND n.id > ?"
         params.append(after_id)
-    sql += " ORDER BY date DESC, time DESC LIMIT ?"
+    sql += " ORDER BY n.id ASC LIMIT ?" if oldest_first else " ORDER BY date DESC, time DESC LIMIT ?"
     params.append(min(limit, 500))
 
-    cur = conn.execute(sql, params)
-    rows = cur.fetchall()
+    rows = _plain_cursor(conn).execute(sql, params).fetchall()
     out = []
-    for row in rows:
-        r = _row_to_dict(row)
-        ts = _parse_legacy_datetime(r.get("date") or "", r.get("time") or "")
-        common = (r.get("common_name") or "").strip() or (r.get("scientific_name") or "")
-        scientific = (r.get("scientific_name") or "").strip()
+    for id_, date_s, time_s, scientific_name, common_name, confidence, clip_name, image_url in rows:
         out.append({
-            "id": str(r.get("id", "")),
-            "timestamp": ts,
-            "common_name": common,
-            "scientific_name": scientific,
-            "confidence": float(r.get("confidence") or 0),
-            "audio_path": (r.get("clip_name") or "") or "",
-            "image_url": r.get("image_url") or "",
+            "id": str(id_),
+            "timestamp": _parse_legacy_datetime(date_s or "", time_s or ""),
+            "common_name": (common_name or "").strip() or (scientific_name or ""),
+            "scientific_name": (scientific_name or "").strip(),
+            "confidence": float(confidence or 0),
+            "audio_path": clip_name or "",
+            "image_url": image_url or "",
         })
     return out
 
@@ -259,18 +519,61 @@ def get_stats_legacy(
         params.append(date_end)
     sql += " GROUP BY n.scientific_name ORDER BY count DESC"
 
-    cur = conn.execute(sql, params)
+    rows = _plain_cursor(conn).execute(sql, params).fetchall()
     return [
         {
-            "common_name": (r := _row_to_dict(row)).get("common_name") or r.get("scientific_name") or "",
-            "scientific_name": r.get("scientific_name") or "",
-            "count": int(r.get("count") or 0),
-            "image_url": r.get("image_url") or "",
+            "common_name": common_name or scientific_name or "",
+            "scientific_name": scientific_name or "",
+            "count": int(count or 0),
+            "image_url": image_url or "",
         }
-        for row in cur.fetchall()
+        for scientific_name, common_name, count, image_url in rows
     ]
 
 
+# Filtres de get_detections_v2 (bits du masque) ; les paramètres sont liés dans cet ordre.
+# _DET_NAME (LIKE) et _DET_NAME_FTS (labels_fts) sont exclusifs.
+_DET_START, _DET_END, _DET_NAME, _DET_AFTER_ID, _DET_OLDEST_FIRST, _DET_NAME_FTS = 1, 2, 4, 8, 16, 32
+
+
+def _detections_v2_sql(mask: int) -> str:
+    # Horodatage ISO formaté par SQLite (pas de datetime Python par ligne)
+    sql = """
+        SELECT d.id, strftime('%Y-%m-%dT%H:%M:%SZ', d.detected_at, 'unixepoch') AS timestamp,
+               d.confidence, d.clip_name,
+               l.scientific_name,
+               ic.url AS image_url
+        FROM detections d
+        JOIN labels l ON l.id = d.label_id
+        LEFT JOIN image_caches ic ON ic.label_id = l.id
+        WHERE 1=1
+    """
+    if mask & _DET_START:
+        sql += " AND d.detected_at >= ?"
+    if mask & _DET_END:
+        sql += " AND d.detected_at <= ?"
+    if mask & _DET_NAME:
+        sql += " AND l.scientific_name LIKE ?"
+    if mask & _DET_NAME_FTS:
+        sql += " AND l.id IN (SELECT rowid FROM labels_fts WHERE labels_fts MATCH ?)"
+    if mask & _DET_AFTER_ID:
+        sql += " AND d.id > ?"
+    if mask & _DET_OLDEST_FIRST:
+        sql += " ORDER BY d.id ASC LIMIT ?"
+    else:
+        sql += " ORDER BY d.detected_at DESC LIMIT ?"
+    return sql
+
+
+# Une requête canonique par combinaison de filtres, construite une fois : le texte SQL
+# est toujours identique pour une même forme, le cache d'instructions de sqlite3 sert.
+_DETECTIONS_V2_SQL_BY_MASK = {
+    mask: _detections_v2_sql(mask)
+    for mask in range(64)
+    if not (mask & _DET_NAME and mask & _DET_NAME_FTS)
+}
+
+
 def get_detections_v2(
     conn: sqlite3.Connection,
     date_start: Optional[str] = None,
@@ -278,77 +581,61 @@ def get_detections_v2(
     common_name: Optional[str] = None,
     limit: int = 100,
     after_id: Optional[int] = None,
+    oldest_first: bool = False,
 ) -> list[dict]:
-    """Query detections (v2 or legacy schema). Same JSON shape for both."""
+    """
+    Query detections (v2 or legacy schema). Same JSON shape for both.
+    Most recent first, or by increasing id with oldest_first (MQTT polling with after_id).
+    """
     schema = detect_schema(conn)
     if schema == "legacy":
         return get_detections_legacy(
             conn, date_start=date_start, date_end=date_end, common_name=common_name,
-            limit=limit, after_id=after_id,
+            limit=limit, after_id=after_id, oldest_first=oldest_first,
         )
     if schema != "v2":
         raise SchemaError(
             "Database schema is not v2 (detections+labels) nor legacy (notes)."
         )
-    # Parse dates to Unix range
-    start_ts, end_ts = None, None
-    if date_start:
-        try:
-            start_ts = int(datetime.strptime(date_start, "%Y-%m-%d").timestamp())
-        except ValueError:
-            pass
-    if date_end:
-        try:
-            end_ts = int(
-                datetime.strptime(date_end + " 23:59:59", "%Y-%m-%d %H:%M:%S").timestamp()
-            )
-        except ValueError:
-            pass
+    start_ts, end_ts = _unix_date_range(date_start, date_end)
 
-    sql = """
-        SELECT d.id, d.detected_at, d.confidence, d.clip_name,
-               l.scientific_name,
-               ic.url AS image_url
-        FROM detections d
-        JOIN labels l ON l.id = d.label_id
-        LEFT JOIN image_caches ic ON ic.label_id = l.id
-        WHERE 1=1
-    """
+    mask = 0
     params: list[Any] = []
     if start_ts is not None:
-        sql += " AND d.detected_at >= ?"
+        mask |= _DET_START
         params.append(start_ts)
     if end_ts is not None:
-        sql += " AND d.detected_at <= ?"
+        mask |= _DET_END
         params.append(end_ts)
     if common_name:
-        sql += " AND l.scientific_name LIKE ?"
-        params.append(f"%{common_name}%")
+        # Trigram : au moins 3 caractères ; les jokers % et _ restent du ressort de LIKE
+        if len(common_name) >= 3 and not ("%" in common_name or "_" in common_name) and _has_labels_fts(conn):
+            mask |= _DET_NAME_FTS
+            params.append('"' + common_name.replace('"', '""') + '"')
+        else:
+            mask |= _DET_NAME
+            params.append(f"%{common_name}%")
     if after_id is not None:
-        sql += " AND d.id > ?"
+        mask |= _DET_AFTER_ID
         params.append(after_id)
-    sql += " ORDER BY d.detected_at DESC LIMIT ?"
+    if oldest_first:
+        mask |= _DET_OLDEST_FIRST
     params.append(min(limit, 500))
+    sql = _DETECTIONS_V2_SQL_BY_MASK[mask]
 
-    cur = conn.execute(sql, params)
-    rows = cur.fetchall()
+    rows = _plain_cursor(conn).execute(sql, params).fetchall()
     out = []
-    for row in rows:
-        r = _row_to_dict(row)
-        ts = r.get("detected_at")
-        if ts is not None:
-            r["timestamp"] = datetime.utcfromtimestamp(ts).strftime("%Y-%m-%dT%H:%M:%SZ")
-        r["common_name"] = r.get("scientific_name") or ""
-        r["scientific_name"] = r.get("scientific_name") or ""
+    for id_, timestamp, confidence, clip_name, scientific_name, image_url in rows:
+        name = scientific_name or ""
         out.append(
             {
-                "id": str(r.get("id", "")),
-                "timestamp": r.get("timestamp", ""),
-                "common_name": r["common_name"],
-                "scientific_name": r["scientific_name"],
-                "confidence": float(r.get("confidence") or 0),
-                "audio_path": (r.get("clip_name") or "") or "",
-                "image_url": r.get("image_url") or "",
+                "id": str(id_),
+                "timestamp": timestamp or "",
+                "common_name": name,
+                "scientific_name": name,
+                "confidence": float(confidence or 0),
+                "audio_path": clip_name or "",
+                "image_url": image_url or "",
             }
         )
     return out
@@ -367,19 +654,7 @@ def get_stats_v2(
         raise SchemaError(
             "Database schema is not v2 (detections+labels) nor legacy (notes)."
         )
-    start_ts, end_ts = None, None
-    if date_start:
-        try:
-            start_ts = int(datetime.strptime(date_start, "%Y-%m-%d").timestamp())
-        except ValueError:
-            pass
-    if date_end:
-        try:
-            end_ts = int(
-                datetime.strptime(date_end + " 23:59:59", "%Y-%m-%d %H:%M:%S").timestamp()
-            )
-        except ValueError:
-            pass
+    start_ts, end_ts = _unix_date_range(date_start, date_end)
 
     name_sql = _label_preferred_name_sql(conn)
     sql = f"""
@@ -399,18 +674,15 @@ def get_stats_v2(
         params.append(end_ts)
     sql += " GROUP BY l.scientific_name ORDER BY count DESC"
 
-    cur = conn.execute(sql, params)
-    rows = cur.fetchall()
+    rows = _plain_cursor(conn).execute(sql, params).fetchall()
     return [
         {
-            "common_name": (r := _row_to_dict(row)).get("common_name")
-            or r.get("scientific_name")
-            or "",
-            "scientific_name": r.get("scientific_name") or "",
-            "count": int(r.get("count") or 0),
-            "image_url": r.get("image_url") or "",
+            "common_name": common_name or scientific_name or "",
+            "scientific_name": scientific_name or "",
+            "count": int(count or 0),
+            "image_url": image_url or "",
         }
-        for row in rows
+        for scientific_name, common_name, count, image_url in rows
     ]
 
 
@@ -438,7 +710,7 @@ def get_hourly_detections(
             WHERE n.date = ?
             GROUP BY n.scientific_name, hour
         """
-        rows = [_row_to_dict(r) for r in conn.execute(sql, [date_str]).fetchall()]
+        rows = _plain_cursor(conn).execute(sql, [date_str]).fetchall()
     elif schema == "v2":
         if tz_cfg and ZoneInfo is not None:
             try:
@@ -460,37 +732,37 @@ def get_hourly_detections(
                 WHERE date(datetime(d.detected_at, 'unixepoch', 'localtime')) = ?
                 GROUP BY l.scientific_name, hour
             """
-            rows = [_row_to_dict(r) for r in conn.execute(sql, [date_str]).fetchall()]
+            rows = _plain_cursor(conn).execute(sql, [date_str]).fetchall()
     else:
         return {"date": date_str, "sunrise": None, "sunset": None, "species": []}
 
-    # Aggregate into species dict
+    # Aggregate into species dict ; lignes (scientific_name, common_name, hour, count, image_url)
     species_map: dict[str, dict] = {}
-    for r in rows:
-        name = r["scientific_name"]
-        if name not in species_map:
-            species_map[name] = {
+    for name, common_name, hour, count, image_url in rows:
+        sp = species_map.get(name)
+        if sp is None:
+            sp = species_map[name] = {
                 "scientific_name": name,
-                "common_name": r.get("common_name") or name,
-                "image_url": r.get("image_url") or "",
+                "common_name": common_name or name,
+                "image_url": image_url or "",
                 "hourly_counts": [0] * 24,
                 "total": 0,
             }
-        hour = int(r.get("hour") or 0)
-        count = int(r.get("count") or 0)
+        hour = int(hour or 0)
+        count = int(count or 0)
         if 0 <= hour <= 23:
-            species_map[name]["hourly_counts"][hour] = count
-        species_map[name]["total"] += count
-        if r.get("image_url"):
-            species_map[name]["image_url"] = r["image_url"]
+            sp["hourly_counts"][hour] = count
+        sp["total"] += count
+        if image_url:
+            sp["image_url"] = image_url
 
     species_list = sorted(species_map.values(), key=lambda x: x["total"], reverse=True)
 
     # Sunrise / sunset for daylight bar (Unix timestamps)
-    de_row = conn.execute(
+    de_row = _plain_cursor(conn).execute(
         "SELECT sunrise, sunset FROM daily_events WHERE date = ? LIMIT 1", [date_str]
     ).fetchone()
-    de = _row_to_dict(de_row) if de_row else {}
+    sunrise, sunset = de_row or (None, None)
 
     # Heures 0–23 : même fuseau que les comptes (IANA si timezone config, sinon serveur).
     sr_h = ss_h = None
@@ -500,18 +772,18 @@ def get_hourly_detections(
             tz_for_sun = ZoneInfo(tz_cfg)
         except Exception:
             tz_for_sun = None
-    if de.get("sunrise") is not None:
+    if sunrise is not None:
         try:
-            ts = int(de["sunrise"])
+            ts = int(sunrise)
             if tz_for_sun is not None:
                 sr_h = int(datetime.fromtimestamp(ts, tz=tz_for_sun).hour)
             else:
                 sr_h = int(datetime.fromtimestamp(ts).hour)
         except (ValueError, TypeError, OSError, OverflowError):
             sr_h = None
-    if de.get("sunset") is not None:
+    if sunset is not None:
         try:
-            ts = int(de["sunset"])
+            ts = int(sunset)
             if tz_for_sun is not None:
                 ss_h = int(datetime.fromtimestamp(ts, tz=tz_for_sun).hour)
             else:
@@ -521,8 +793,8 @@ def get_hourly_detections(
 
     out: dict[str, Any] = {
         "date": date_str,
-        "sunrise": de.get("sunrise"),
-        "sunset": de.get("sunset"),
+        "sunrise": sunrise,
+        "sunset": sunset,
         "sunrise_hour": sr_h,
         "sunset_hour": ss_h,
         "species": species_list,
@@ -588,25 +860,26 @@ def get_aggregate_detections(conn: sqlite3.Connection, mode: str) -> dict:
             ORDER BY n.scientific_name, period
         """
 
-    rows = [_row_to_dict(r) for r in conn.execute(sql).fetchall()]
-    columns = sorted({r["period"] for r in rows})
+    # Lignes (scientific_name, common_name, period, count, image_url)
+    rows = _plain_cursor(conn).execute(sql).fetchall()
+    columns = sorted({r[2] for r in rows})
 
     species_map: dict[str, dict] = {}
-    for r in rows:
-        name = r["scientific_name"]
-        if name not in species_map:
-            species_map[name] = {
+    for name, common_name, period, count, image_url in rows:
+        sp = species_map.get(name)
+        if sp is None:
+            sp = species_map[name] = {
                 "scientific_name": name,
-                "common_name": r.get("common_name") or name,
-                "image_url": r.get("image_url") or "",
+                "common_name": common_name or name,
+                "image_url": image_url or "",
                 "counts": {c: 0 for c in columns},
                 "total": 0,
             }
-        count = int(r.get("count") or 0)
-        species_map[name]["counts"][r["period"]] = count
-        species_map[name]["total"] += count
-        if r.get("image_url"):
-            species_map[name]["image_url"] = r["image_url"]
+        count = int(count or 0)
+        sp["counts"][period] = count
+        sp["total"] += count
+        if image_url:
+            sp["image_url"] = image_url
 
     species_list = [
         {
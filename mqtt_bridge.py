@@ -2,28 +2,37 @@
 MQTT bridge: poll BirdNET-Go DB for new detections and publish each to a topic.
 Home Assistant can subscribe to birdnet_api2ha/detections without modifying BirdNET-Go.
 """
-import json
 import os
+import sqlite3
+import sys
 import time
+from json import dumps as _jdumps
 from typing import Any, Optional
 
 import paho.mqtt.client as mqtt
 
 from config import load_config
-from db import get_connection, get_detections_v2, get_max_detection_id
+from db import database_replaced, get_connection, get_detections_v2, get_max_detection_id
 
 _last_max_id: int = 0
 
 
-def _publish_detection(client: mqtt.Client, topic: str, det: dict[str, Any]) -> None:
-    payload = {
-        "id": det.get("id"),
-        "timestamp": det.get("timestamp"),
-        "common_name": det.get("common_name"),
-        "scientific_name": det.get("scientific_name"),
-        "confidence": det.get("confidence"),
-    }
-    client.publish(topic, json.dumps(payload), qos=0, retain=False)
+def _detection_payload(det: dict[str, Any]) -> bytes:
+    # JSON assemblé directement (pas de dict intermédiaire) ; seules les chaînes passent par l'encodeur
+    return (
+        f'{{"id":{_jdumps(det["id"])},"timestamp":{_jdumps(det["timestamp"])},'
+        f'"common_name":{_jdumps(det["common_name"])},'
+        f'"scientific_name":{_jdumps(det["scientific_name"])},'
+        f'"confidence":{det["confidence"]!r}}}'
+    ).encode("ascii")
+
+
+def _publish_detections(client: mqtt.Client, topic: str, items: list[dict[str, Any]]) -> None:
+    """Encode tout le lot puis publie (QoS 0, octets prêts : paho n'a plus rien à convertir)."""
+    payloads = [_detection_payload(det) for det in items]
+    publish = client.publish
+    for payload in payloads:
+        publish(topic, payload, qos=0, retain=False)
 
 
 def run_bridge():
@@ -32,12 +41,13 @@ def run_bridge():
     if not mqtt_cfg.get("enabled"):
         return
     db_path = cfg.get("database_path")
-    if not db_path or not os.path.isfile(db_path):
+    if not db_path:
         return
     host = mqtt_cfg.get("host", "localhost")
     port = int(mqtt_cfg.get("port", 1883))
     topic = mqtt_cfg.get("topic", "birdnet_api2ha/detections")
     interval = int(mqtt_cfg.get("poll_interval_seconds", 10))
+    interval_ns = interval * 1_000_000_000
     username = mqtt_cfg.get("username") or os.environ.get("BIRDNET_MQTT_USERNAME", "")
     password = mqtt_cfg.get("password") or os.environ.get("BIRDNET_MQTT_PASSWORD", "")
 
@@ -48,20 +58,46 @@ def run_bridge():
     client.loop_start()
 
     global _last_max_id
-    with get_connection(db_path) as conn:
-        _last_max_id = get_max_detection_id(conn)
-
+    synced = False
+    last_error = ""
     try:
         while True:
-            time.sleep(interval)
-            with get_connection(db_path) as conn:
-                current_max = get_max_detection_id(conn)
-                if current_max <= _last_max_id:
-                    continue
-                items = get_detections_v2(conn, limit=500, after_id=_last_max_id)
-                for det in items:
-                    _publish_detection(client, topic, det)
-                _last_max_id = current_max
+            try:
+                # Connexion gardée ouverte entre les tours (pas de réouverture à chaque
+                # intervalle) ; rouverte si le fichier est remplacé ou si SQLite échoue.
+                with get_connection(db_path) as conn:
+                    if not synced:
+                        _last_max_id = get_max_detection_id(conn)
+                        synced = True
+                    # Échéances fixes (horloge monotone) : la durée d'un tour ne décale pas les suivants
+                    deadline = time.monotonic_ns()
+                    while True:
+                        deadline += interval_ns
+                        sleep_s = (deadline - time.monotonic_ns()) / 1e9
+                        if sleep_s > 0:
+                            time.sleep(sleep_s)
+                        else:
+                            deadline = time.monotonic_ns()  # en retard : repartir de maintenant
+                        if database_replaced(conn, db_path):
+                            break
+                        # Une seule requête par tour : les nouvelles lignes, par id croissant
+                        items = get_detections_v2(
+                            conn, limit=500, after_id=_last_max_id, oldest_first=True
+                        )
+                        if items:
+                            _publish_detections(client, topic, items)
+                            _last_max_id = int(items[-1]["id"])
+                        last_error = ""
+            except (FileNotFoundError, sqlite3.OperationalError) as e:
+                # Base introuvable dès le départ : pas de pont (SQLite le signale, pas de stat préalable)
+                if not synced:
+                    print(f"Pont MQTT: impossible d'ouvrir la base: {e}", file=sys.stderr)
+                    return
+                # Nouvel essai à chaque intervalle ; message affiché quand l'erreur change
+                if str(e) != last_error:
+                    last_error = str(e)
+                    print(f"Pont MQTT: erreur base, nouvel essai toutes les {interval} s: {e}", file=sys.stderr)
+                time.sleep(interval)
     except KeyboardInterrupt:
         pass
     finally: